@@ -3,7 +3,9 @@ datapoints in the multidimensional space.
 """
 
 from typing import Iterable, Dict
-from copy import deepcopy
+from itertools import count
+
+import numpy as np
 
 from typing import TYPE_CHECKING
 
@@ -18,11 +20,28 @@ class Point:
     space and its dimensionality.
     """
 
+    # No per-instance __dict__ - points are created in bulk and accessed
+    # in tight loops, so the attributes live at fixed slot offsets
+    __slots__ = ("_arr", "_Point__coords_tuple", "_Point__sq_norm",
+                 "_Point__bits")
+
     def __init__(self, coords: Iterable[float]):
         """Initor accepting the numeric (float) values as the representation
         of the point in the multidimensional space.
+
+        Internally, the values are stored in a single contiguous numpy
+        array (attribute `_arr`), so the calculations over the point can
+        be performed as vectorized operations. When the given coordinates
+        already are an ndarray, it is adopted as is - without the
+        element-by-element round-trip through a Python list.
         """
-        self.__coords = list(coords)
+        if isinstance(coords, np.ndarray):
+            self._arr = np.ascontiguousarray(coords)
+        else:
+            self._arr = np.ascontiguousarray(list(coords))
+        self.__coords_tuple = None
+        self.__sq_norm = None
+        self.__bits = None
 
     @property
     def coords(self) -> tuple[float]:
@@ -31,27 +50,67 @@ class Point:
 
         For each of the dimension of the point, it returns a single numeric
         value as a representation of indentation in the given axis.
+
+        The tuple is built lazily on the first access and cached - the
+        coordinates of a point never change.
         """
-        return tuple(self.__coords)
+        if self.__coords_tuple is None:
+            self.__coords_tuple = tuple(self._arr.tolist())
+        return self.__coords_tuple
+
+    def _replace_coords(self, arr: np.ndarray):
+        """Replaces the internal coordinate array and drops the cached
+        derived forms of the coordinates.
+        """
+        self._arr = np.ascontiguousarray(arr)
+        self.__coords_tuple = None
+        self.__sq_norm = None
+        self.__bits = None
+
+    @property
+    def _bits(self) -> np.ndarray | None:
+        """Bit-packed form of the coordinates for points whose every value
+        is 0 or 1, computed lazily and cached; `None` for any other point.
+
+        Packing 64 binary dimensions into 8 bytes lets the hamming metric
+        count the differing ones with a xor and a popcount instead of
+        comparing the values one dimension at a time.
+        """
+        if self.__bits is None:
+            if np.isin(self._arr, (0, 1)).all():
+                self.__bits = np.packbits(self._arr.astype(bool))
+            else:
+                # The False sentinel remembers the point is not binary,
+                # so the check above does not run again
+                self.__bits = False
+        return self.__bits if self.__bits is not False else None
+
+    @property
+    def _sq_norm(self) -> float:
+        """Squared euclidean norm of the point, computed lazily on the
+        first access and cached afterwards.
+
+        Metrics can combine the cached norms of two points with a single
+        dot product to get their distance, instead of recomputing the
+        full difference every time.
+        """
+        if self.__sq_norm is None:
+            self.__sq_norm = float(self._arr @ self._arr)
+        return self.__sq_norm
 
     @property
     def dimensionality(self) -> int:
         """Number of dimensions this point is described in."""
-        return len(self.coords)
+        return self._arr.size
 
     def normalize(self, frame: tuple["Point", "Point"]) -> "Point":
         """Normalizes the values for each of the dimension by the given frame.
         The result values for each of the dimension are inside interval of
         [0; 1].
         """
-        normalized = []
-
-        for dim in range(self.dimensionality):
-            d_min = frame[0].coords[dim]
-            d_max = frame[1].coords[dim]
-            normalized.append((self.coords[dim] - d_min) / (d_max - d_min))
-
-        return Point(normalized)
+        mins = frame[0]._arr
+        maxs = frame[1]._arr
+        return Point((self._arr - mins) / (maxs - mins))
 
     def __repr__(self):
         return f"{self.coords}"
@@ -66,6 +125,8 @@ class Example(Point):
     strings mapped by strings.
     """
 
+    __slots__ = ("_Example__other_attrs",)
+
     def __init__(self,
                  coords: Iterable[float],
                  other_attrs: Dict[str, str] = None):
@@ -79,22 +140,23 @@ class Example(Point):
 
     @property
     def other_attrs(self) -> Dict[str, str]:
-        """Deep copy of the dictionary responsible for storing other less
+        """Shallow copy of the dictionary responsible for storing other less
         relevant attributes mapped by `str -> str`.
+
+        Since both the keys and the values are immutable strings, a shallow
+        copy protects the internal state just as well as a deep one, without
+        the recursive walk over all the items.
         """
-        return deepcopy(self.__other_attrs)
+        return dict(self.__other_attrs)
 
     def normalize(self, frame: tuple["Point", "Point"]) -> "Point":
         """Normalizes the values for each of the dimension by the given frame.
         The result values for each of the dimension are inside interval of
         [0; 1].
         """
-        normalized = []
-
-        for dim in range(self.dimensionality):
-            d_min = frame[0].coords[dim]
-            d_max = frame[1].coords[dim]
-            normalized.append((self.coords[dim] - d_min) / (d_max - d_min))
+        mins = frame[0]._arr
+        maxs = frame[1]._arr
+        normalized = (self._arr - mins) / (maxs - mins)
 
         return Example(normalized, self.other_attrs)
 
@@ -110,8 +172,12 @@ class Centroid(Point):
     `centroid_of`.
     """
 
-    # Counter to uniquely identify the centroids
-    __COUNTER = 0
+    __slots__ = ("_Centroid__points", "_Centroid__name",
+                 "_Centroid__points_tuple", "_Centroid__points_arr")
+
+    # Counter to uniquely identify the centroids; next() on it is atomic,
+    # so the generated names stay unique even across threads
+    _counter = count()
 
     def __init__(self,
                  coords: Iterable[float],
@@ -125,16 +191,32 @@ class Centroid(Point):
         """
         super().__init__(coords)
         self.__points = list(points)
-        self.__name = name
+        self.__name = name or f"centroid_{next(Centroid._counter)}"
 
-        if not self.name:
-            self.__name = f"centroid_{Centroid.__COUNTER}"
-            Centroid.__COUNTER += 1
+        # Lazily built, cached forms of the assigned points; dropped
+        # whenever the membership of the cluster changes
+        self.__points_tuple = None
+        self.__points_arr = None
 
     @property
     def points(self) -> tuple[Point]:
-        """Tuple of points in this cluster."""
-        return tuple(self.__points)
+        """Tuple of points in this cluster.
+
+        The tuple is built lazily and cached until the cluster membership
+        changes, so repeated accesses do not allocate over and over.
+        """
+        if self.__points_tuple is None:
+            self.__points_tuple = tuple(self.__points)
+        return self.__points_tuple
+
+    @property
+    def _points_matrix(self) -> np.ndarray:
+        """Coordinates of all the assigned points stacked into a single
+        matrix; cached the same way the tuple form is.
+        """
+        if self.__points_arr is None:
+            self.__points_arr = np.stack([p._arr for p in self.__points])
+        return self.__points_arr
 
     @property
     def number_of_points(self) -> int:
@@ -150,7 +232,11 @@ class Centroid(Point):
     def frame(self) -> tuple[Point, Point]:
         """Calculates the two framing points describing the space the
         datapoints being assigned to this cluster (centroid)."""
-        return frame_of(self.points)
+        if not self.__points:
+            raise ValueError("No point provided")
+
+        # The cached matrix of the members spares the restacking pass
+        return _frame_of_stacked(self._points_matrix)
 
     def variance(self, metric: "Metric") -> float:
         """Calculates the variance of the cluster by squaring the distances
@@ -158,8 +244,19 @@ class Centroid(Point):
         assigned to it.
 
         To achieve this approach, the metric to calculate the distance has to
-        be provided."""
-        dist_squares = [metric.distance(self, p) ** 2 for p in self.points]
+        be provided. For the euclidean metric, the whole calculation runs
+        as one vectorized reduction over the stacked point coordinates."""
+        if not self.__points:
+            return 0.0
+
+        # Imported here to dodge the circular dependency of the modules
+        from src.metric import Euclidean
+
+        if isinstance(metric, Euclidean):
+            diffs = self._points_matrix - self._arr
+            return float((diffs * diffs).sum())
+
+        dist_squares = [metric.distance(self, p) ** 2 for p in self.__points]
         return sum(dist_squares)
 
     def __repr__(self):
@@ -174,10 +271,20 @@ class Centroid(Point):
     def add_point(self, point: Point):
         """Registers the given point in the centroid."""
         self.__points.append(point)
+        self.__points_tuple = None
+        self.__points_arr = None
+
+    def assign_points(self, points: Iterable[Point]):
+        """Replaces all the points assigned to the centroid at once."""
+        self.__points = list(points)
+        self.__points_tuple = None
+        self.__points_arr = None
 
     def flush(self):
         """Removes all the points assigned to the centroid."""
         self.__points.clear()
+        self.__points_tuple = None
+        self.__points_arr = None
 
     def recalculate(self) -> "Centroid":
         """Recalculates the centroid coordinates by creating the new instance.
@@ -185,6 +292,16 @@ class Centroid(Point):
         """
         return Centroid.centroid_of(self.points, self.name)
 
+    def recompute_in_place(self):
+        """Recalculates the centroid coordinates as the mean of the
+        currently assigned points, mutating this very instance instead
+        of allocating a new one like `recalculate` does.
+
+        When there is no point assigned, the centroid stays where it is.
+        """
+        if self.__points:
+            self._replace_coords(self._points_matrix.mean(axis=0))
+
     @staticmethod
     def centroid_of(points: Iterable[Point], name: str = "") -> "Centroid":
         """Static method implemented as a factory for the centroids by given
@@ -193,21 +310,19 @@ class Centroid(Point):
         This method is responsible for creating a new instance of centroid to
         make the process of the creation easier.
         """
-        # Check the consistency of dimensions
-        dimensionality_check(points)
-
-        # Turn points into a tuple
-        points = tuple(points)
-        n = len(points)
+        # Check the consistency of dimensions and turn points into a tuple
+        points = _check_and_tuple(points)
 
-        # Default dimensionality
-        dimensionality = points[0].dimensionality
-        averages = []
+        # Average the point coordinates in a single vectorized pass
+        stacked = np.stack([p._arr for p in points])
+        centroid = Centroid(stacked.mean(axis=0), points, name)
 
-        for dimension in range(dimensionality):
-            averages.append(sum(p.coords[dimension] for p in points) / n)
+        # The stacked matrix and the tuple of points are exactly what the
+        # new centroid would lazily rebuild - seed its caches right away
+        centroid.__points_arr = stacked
+        centroid.__points_tuple = points
 
-        return Centroid(averages, points, name)
+        return centroid
 
     @staticmethod
     def centroid_of_point(point: Point, name: str = "") -> "Centroid":
@@ -249,51 +364,68 @@ class NormalizationError(Exception):
         super().__init__(message)
 
 
+def _check_and_tuple(points: Iterable[Point]) -> tuple[Point]:
+    """Checks the consistency of the given points' dimensionality and
+    returns them as a tuple.
+
+    The conversion happens just once here, so the callers can reuse the
+    returned tuple instead of materializing the iterable again.
+    """
+    points = tuple(points)
+
+    if len(points) == 0:
+        raise ValueError("No point provided")
+    elif len({point.dimensionality for point in points}) > 1:
+        raise InconsistentDimensionalityError(points)
+
+    return points
+
+
 def dimensionality_check(points: Iterable[Point]):
     """Checks that all of the given points have the same dimensionality.
     When there is a point with unique number of dimensions, it raises an
     `InconsistentDimensionalityError`.
     """
-    if len(tuple(points)) == 0:
-        raise ValueError("No point provided")
-    elif len({point.dimensionality for point in points}) > 1:
-        raise InconsistentDimensionalityError(points)
+    _check_and_tuple(points)
 
 
 def minimums(points: Iterable[Point]) -> tuple[float]:
     """Finds out the minimal values in each of the dimension for each of the
     point in the given iterable of points.
     """
-    dimensionality_check(points)
-    points = tuple(points)
-    n_dim = points[0].dimensionality
+    points = _check_and_tuple(points)
 
-    return tuple(
-        # For each dimension find the minimum over all the points and
-        # cast these to float for type hinting purposes
-        min([float(p.coords[dim]) for p in points]) for dim in range(n_dim)
-    )
+    # Find the minimum in every dimension in one vectorized pass and
+    # cast these to float for type hinting purposes
+    stacked = np.stack([p._arr for p in points])
+    return tuple(stacked.min(axis=0).astype(float).tolist())
 
 
 def maximums(points: Iterable[Point]) -> tuple[float]:
     """Finds out the maximum values in each of the dimension for each of the
     point in the given iterable of points.
     """
-    dimensionality_check(points)
-    points = tuple(points)
-    n_dim = points[0].dimensionality
+    points = _check_and_tuple(points)
+
+    # Find the maximum in every dimension in one vectorized pass and
+    # cast these to float for type hinting purposes
+    stacked = np.stack([p._arr for p in points])
+    return tuple(stacked.max(axis=0).astype(float).tolist())
 
-    return tuple(
-        # For each dimension find the maximum over all the points and
-        # cast these to float for type hinting purposes
-        max([float(p.coords[dim]) for p in points]) for dim in range(n_dim)
-    )
+
+def _frame_of_stacked(stacked: np.ndarray) -> tuple[Point, Point]:
+    """Builds the two framing points from an already stacked coordinate
+    matrix, saving the callers that hold one a second stacking pass."""
+    return Point(stacked.min(axis=0)), Point(stacked.max(axis=0))
 
 
 def frame_of(points: Iterable[Point]) -> tuple[Point, Point]:
     """Creates two framing points as a minimum and maximum values in each of
     the dimension."""
-    return Point(minimums(points)), Point(maximums(points))
+    points = _check_and_tuple(points)
+
+    # One stacked matrix serves both of the reductions
+    return _frame_of_stacked(np.stack([p._arr for p in points]))
 
 
 def normalize(points: Iterable[Point]) -> tuple[Point]:
@@ -306,23 +438,19 @@ def normalize(points: Iterable[Point]) -> tuple[Point]:
         - When for any of the dimension is the min value equal to the max one
         - When is normalization performed on a centroid
     """
-    dimensionality_check(points)
-
-    points = tuple(points)
-
-    if len(points) == 0:
-        raise NormalizationError("Cannot normalize an empty iterable")
-
-    n_dims = points[0].dimensionality
+    points = _check_and_tuple(points)
 
-    frame = frame_of(points)
-    mins = frame[0].coords
-    maxs = frame[1].coords
+    # Stack the coordinates just once; the frame and the zero-range check
+    # are both single vectorized reductions over this matrix
+    stacked = np.stack([p._arr for p in points])
+    frame = _frame_of_stacked(stacked)
 
-    if not all(maxs[dim] != mins[dim] for dim in range(n_dims)):
+    if (frame[1]._arr == frame[0]._arr).any():
         raise NormalizationError(
             "Difference between min and max has to be for every dimension > 0")
 
+    # The rescaling stays polymorphic so examples keep their attributes
+    # and centroids keep raising
     return tuple(point.normalize(frame) for point in points)
 
 
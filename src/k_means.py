@@ -2,11 +2,124 @@
 """
 
 from typing import Iterable
-from random import sample
 
-from src.datapoint import Centroid, Point
+import numpy as np
+
+from src.datapoint import Centroid, Point, dimensionality_check
 from src.metric import Metric, Euclidean
 
+# Numba is an optional dependency; when it is not installed, the training
+# falls back to the plain numpy implementation
+try:
+    from numba import njit, prange
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+
+if _NUMBA_AVAILABLE:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _assign_generic(x, c, labels):
+        """Assigns every point to its closest centroid (by the squared
+        euclidean distance) in a parallel compiled loop, for any
+        dimensionality.
+        """
+        n, dims = x.shape
+        k = c.shape[0]
+
+        for i in prange(n):
+            best = 0
+            best_dist = np.inf
+            for cluster in range(k):
+                acc = 0.0
+                for dim in range(dims):
+                    diff = x[i, dim] - c[cluster, dim]
+                    acc += diff * diff
+                if acc < best_dist:
+                    best_dist = acc
+                    best = cluster
+            labels[i] = best
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _assign_d2(x, c, labels):
+        """Assignment kernel specialized for two-dimensional data - the
+        distance is fully unrolled, so the per-dimension loop overhead
+        disappears and the expression compiles into a handful of FMAs.
+        """
+        n = x.shape[0]
+        k = c.shape[0]
+
+        for i in prange(n):
+            x0 = x[i, 0]
+            x1 = x[i, 1]
+            best = 0
+            best_dist = np.inf
+            for cluster in range(k):
+                d0 = x0 - c[cluster, 0]
+                d1 = x1 - c[cluster, 1]
+                dist = d0 * d0 + d1 * d1
+                if dist < best_dist:
+                    best_dist = dist
+                    best = cluster
+            labels[i] = best
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _assign_d3(x, c, labels):
+        """Assignment kernel specialized for three-dimensional data, with
+        the distance expression fully unrolled just like in the 2D one.
+        """
+        n = x.shape[0]
+        k = c.shape[0]
+
+        for i in prange(n):
+            x0 = x[i, 0]
+            x1 = x[i, 1]
+            x2 = x[i, 2]
+            best = 0
+            best_dist = np.inf
+            for cluster in range(k):
+                d0 = x0 - c[cluster, 0]
+                d1 = x1 - c[cluster, 1]
+                d2 = x2 - c[cluster, 2]
+                dist = d0 * d0 + d1 * d1 + d2 * d2
+                if dist < best_dist:
+                    best_dist = dist
+                    best = cluster
+            labels[i] = best
+
+    # Assignment kernels specialized by the dimensionality of the data
+    _ASSIGN_KERNELS = {2: _assign_d2, 3: _assign_d3}
+
+    @njit(fastmath=True, cache=True)
+    def _update_centroids(x, c, labels, new_c, sums, counts):
+        """Recomputes the centroid coordinates from the assigned labels.
+
+        The per-cluster sums and counts are accumulated in one pass; the
+        sums buffer is float64 no matter the dtype of the data, so long
+        additions do not drift away. Clusters without any point assigned
+        keep their previous coordinates.
+        """
+        n, dims = x.shape
+        k = c.shape[0]
+
+        counts[:] = 0
+        sums[:] = 0.0
+        for i in range(n):
+            cluster = labels[i]
+            counts[cluster] += 1
+            for dim in range(dims):
+                sums[cluster, dim] += x[i, dim]
+
+        # Turn the sums into means; empty clusters stay where they were
+        for cluster in range(k):
+            if counts[cluster] > 0:
+                for dim in range(dims):
+                    new_c[cluster, dim] = sums[cluster, dim] / counts[cluster]
+            else:
+                for dim in range(dims):
+                    new_c[cluster, dim] = c[cluster, dim]
+
 
 class KMeans:
     """K-Means algorithm is so called Centroid-based algorithm, that tries to
@@ -18,10 +131,15 @@ class KMeans:
     purposes.
     """
 
+    # Supported initialization schemes for the default centroids
+    INIT_METHODS = ("random", "k-means++")
+
     def __init__(self,
                  n_clusters: int,
                  metric: Metric = Euclidean(),
-                 accuracy: float = 0.001):
+                 accuracy: float = 0.001,
+                 init_method: str = "random",
+                 dtype: np.dtype = np.float32):
         """Initor of the class taking the input parameters under which the
         algorithm will be searching for the knowledge.
 
@@ -32,12 +150,41 @@ class KMeans:
         just a security feature to make the algorithm more reliable and not
         to get stuck in the local minima or to prevent kind of infinite
         oscillation between possible solutions that might be sufficient.
+
+        The optional initialization method describes how the default
+        centroids are selected when none are given - either 'random'
+        (uniform pick of the given points) or 'k-means++' (points far
+        from the already selected ones are preferred, which usually
+        lowers the number of iterations needed).
+
+        The optional dtype sets the precision the training matrices are
+        kept in. The default float32 halves the memory traffic compared
+        to the usual float64 and is plenty for clustering; the centroid
+        sums are accumulated in float64 regardless, so even very large
+        clusters do not lose their mean to the rounding. Passing
+        np.float16 halves the traffic once more, which pays off on
+        memory-bound datasets at the price of roughly three decimal
+        digits of coordinate precision.
         """
+        if init_method not in KMeans.INIT_METHODS:
+            raise KMeansError(f"Unknown init method: '{init_method}'")
+
         self.__n_clusters = n_clusters
+        self.__init_method = init_method
+        self.__dtype = np.dtype(dtype)
         self.__centroids: list[Centroid] = []
         self.__metric = metric
         self.__accuracy = accuracy
 
+        # Squared accuracy, precomputed once for the convergence checks
+        self.__accuracy_sq = accuracy ** 2
+
+        # Cached (K, D) matrix of the centroid coordinates and cached
+        # name -> centroid index; both rebuilt lazily whenever the
+        # centroids are replaced
+        self.__c_cache: np.ndarray = None
+        self.__name_index: dict = None
+
     @property
     def number_of_clusters(self) -> int:
         """Number of wanted clusters. This is the equivalent to the `k`
@@ -56,6 +203,17 @@ class KMeans:
         """
         return self.__metric
 
+    @property
+    def init_method(self) -> str:
+        """Way the default centroids are selected when none are provided
+        to the training."""
+        return self.__init_method
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Precision the packed training matrices are kept in."""
+        return self.__dtype
+
     @property
     def accuracy(self) -> float:
         """Acceptable level of error. This some kind represents the sufficiency
@@ -65,18 +223,36 @@ class KMeans:
     def closest_centroid(self, p: Point) -> Centroid:
         """This function tries to find the closest centroid in one of the
         already found."""
-        if not self.centroids:
+        cents = self.__centroids
+
+        if not cents:
             raise KMeansError("Model haven't been trained yet")
-        return min(self.centroids, key=lambda c: self.metric.distance(c, p))
+
+        # For the euclidean metric, compare the point against all the
+        # centroids in one vectorized reduction instead of K per-centroid
+        # Python calls
+        if isinstance(self.metric, Euclidean):
+            if self.__c_cache is None:
+                self.__c_cache = self._pack(cents)
+            diffs = self.__c_cache - p._arr
+            return cents[int((diffs * diffs).sum(axis=1).argmin())]
+
+        return min(cents, key=lambda c: self.metric.distance(c, p))
 
     def centroid_by_name(self, name: str) -> Centroid:
         """Tries to find a centroid by given name. If there is no such
-        centroid, it returns `None`."""
-        if not self.centroids:
+        centroid, it returns `None`.
+
+        The lookup goes through a lazily built name index, so repeated
+        queries cost a single hashed access instead of a linear scan.
+        """
+        if not self.__centroids:
             raise KMeansError("Model haven't been trained yet")
-        for centroid in self.centroids:
-            if centroid.name == name:
-                return centroid
+
+        if self.__name_index is None:
+            self.__name_index = {c.name: c for c in self.__centroids}
+
+        return self.__name_index.get(name)
 
     def has_centroid(self, name: str) -> bool:
         """Returns if the model contains a cluster called this way."""
@@ -98,18 +274,208 @@ class KMeans:
         """
         # Initialize the values and process them into wanted form
         self.__centroids = list(defaults)
+        self.__c_cache = None
+        self.__name_index = None
         points = tuple(points)
 
-        # If no default centroids were provided, randomly select some
-        # of the given points
-        if not self.__centroids:
-            for point in sample(population=points, k=self.number_of_clusters):
-                self.__centroids.append(Centroid.centroid_of_point(point))
+        # One bulk consistency check for the whole dataset - the metrics
+        # themselves do not re-check every single pair anymore; the
+        # default centroids are validated along with the points, so a
+        # mismatched centroid matrix never reaches the kernels
+        dimensionality_check(points + tuple(self.__centroids))
+
+        # Pack the whole dataset into its matrix form
+        x = self._pack(points)
 
         # Check the number of given default clusters; if it is not
         # the same as wanted number of clusters (defined in the initor)
-        elif len(self.__centroids) != self.number_of_clusters:
-            raise KMeansError("Inconsistent number of clusters")
+        if self.__centroids:
+            if len(self.__centroids) != self.number_of_clusters:
+                raise KMeansError("Inconsistent number of clusters")
+            c = self._pack(self.__centroids)
+            names = [cent.name for cent in self.__centroids]
+            chosen = None
+
+        # If no default centroids were provided, select some of the given
+        # points; only their coordinates are taken - the Centroid objects
+        # themselves are not built until they are actually needed
+        else:
+            chosen = self._initial_indices(x)
+            c = x[chosen].copy()
+            names = [""] * self.number_of_clusters
+
+        # Keep the centroid matrix in column-major order - its transpose
+        # in the x @ c.T product is then C-contiguous, so BLAS consumes
+        # it directly instead of making a hidden copy every iteration
+        c = np.asfortranarray(c)
+
+        # For the default euclidean metric, the whole iteration can be
+        # performed on matrices; for any other metric, fall back to the
+        # original point-by-point processing
+        if isinstance(self.metric, Euclidean):
+            self._train_vectorized(points, x, c, names)
+        else:
+            if chosen is not None:
+                self.__centroids = [
+                    Centroid.centroid_of_point(points[i]) for i in chosen]
+            self._train_pointwise(points, x)
+
+    def _initial_indices(self, x: np.ndarray) -> np.ndarray:
+        """Selects the indices of the points the default centroids should
+        be placed at, according to the configured initialization method.
+
+        The 'random' method picks the points uniformly without
+        replacement in one batched draw. The 'k-means++' one picks the
+        first point uniformly and every following one with a probability
+        proportional to its squared distance to the closest already
+        selected point.
+        """
+        rng = np.random.default_rng()
+        n = x.shape[0]
+        k = self.number_of_clusters
+
+        if self.init_method == "random":
+            return rng.choice(n, size=k, replace=False)
+
+        # The k-means++ seeding; the distance bookkeeping runs in float64
+        # no matter the training dtype - rng.choice rejects probability
+        # vectors whose sum drifts from 1, which the rounding (or, for
+        # float16, outright overflow) of the narrow dtypes can cause, and
+        # the extra O(N) memory lives only through the seeding
+        xs = x.astype(np.float64)
+        chosen = np.zeros(k, dtype=np.int64)
+        chosen[0] = rng.integers(n)
+        diffs = xs - xs[chosen[0]]
+        dist_sq = (diffs * diffs).sum(axis=1)
+
+        for i in range(1, k):
+            total = float(dist_sq.sum())
+
+            # All the remaining points lie on the already chosen ones
+            if total == 0.0:
+                chosen[i] = rng.integers(n)
+            else:
+                chosen[i] = rng.choice(n, p=dist_sq / total)
+
+            diffs = xs - xs[chosen[i]]
+            dist_sq = np.minimum(dist_sq, (diffs * diffs).sum(axis=1))
+
+        return chosen
+
+    def _pack(self, points: Iterable[Point]) -> np.ndarray:
+        """Packs the given points into a single `(N, D)` row-major matrix
+        of the configured dtype.
+
+        The matrix is the structure-of-arrays representation of the whole
+        point cloud - one contiguous block of memory the training loop can
+        work on, instead of jumping between the individual Point objects.
+        """
+        return np.asarray([p._arr for p in points], dtype=self.__dtype,
+                          order="C")
+
+    def _train_vectorized(self, points: tuple[Point], x: np.ndarray,
+                          c: np.ndarray, names: list[str]):
+        """Performs the actual training loop on the whole dataset at once.
+
+        It takes the points packed into a single `(N, D)` matrix, the
+        initial centroid coordinates as a `(K, D)` one and the names the
+        resulting clusters should carry. Every iteration then computes
+        all the point-to-centroid squared distances in one batch, assigns
+        each point to the centroid with the minimal distance and
+        recomputes the centroid coordinates as per-cluster means. The
+        `Centroid` instances are rebuilt just once, after the convergence.
+        """
+        n_clusters = self.number_of_clusters
+
+        # Indicator of centroid movement
+        changed = True
+        labels = np.zeros(len(points), dtype=np.int64)
+
+        # Pick the assignment kernel - for 2D and 3D data there is a
+        # fully unrolled specialization; numba cannot compile for half
+        # precision, so float16 data stays on the numpy branch (whose
+        # ufuncs handle it natively)
+        use_numba = _NUMBA_AVAILABLE and x.dtype != np.float16
+        if use_numba:
+            assign = _ASSIGN_KERNELS.get(x.shape[1], _assign_generic)
+
+        # Preallocated buffers for the centroid update
+        new_c = np.zeros_like(c)
+        sums = np.zeros(c.shape, dtype=np.float64, order="F")
+        counts = np.zeros(n_clusters, dtype=np.int64)
+
+        # While any of the centroids have changed its coordinates,
+        # repeat another iteration
+        while changed:
+            if use_numba:
+                # Two compiled passes: assignment + centroid update
+                assign(x, c, labels)
+                _update_centroids(x, c, labels, new_c, sums, counts)
+            else:
+                if x.shape[1] <= 4:
+                    # For low-dimensional data it pays off to vectorize
+                    # along the points axis - the differences for all N
+                    # points are computed dimension by dimension, so every
+                    # operation streams over one long axis instead of the
+                    # tiny per-point rows the matrix product would chew on
+                    diffs = x[:, None, :] - c[None, :, :]
+                    scores = (diffs * diffs).sum(axis=-1)
+                else:
+                    # The squared distance is ‖x‖² + ‖c‖² - 2·x·c, but the
+                    # point norms are constant per row and cannot change
+                    # the argmin - so only the halved centroid norms and
+                    # a single matrix product are needed
+                    c_half_sq = 0.5 * np.einsum("ij,ij->i", c, c)
+                    scores = c_half_sq[None, :] - x @ c.T
+
+                # For every point, the index of its closest centroid
+                labels = np.argmin(scores, axis=1)
+
+                # Recalculate the centroid coordinates as means of the
+                # assigned points, summing in float64 to keep the means
+                # of large clusters exact; clusters left without any
+                # point keep their previous coordinates
+                counts = np.bincount(labels, minlength=n_clusters)
+                sums[:] = 0.0
+                np.add.at(sums, labels, x)
+                new_c = (sums / np.maximum(counts, 1)[:, None]).astype(c.dtype)
+                new_c[counts == 0] = c[counts == 0]
+
+            # Check if any of the centroids have moved for distance larger,
+            # than the defined accuracy level (defined in the initor);
+            # comparing squared values spares the square roots
+            deltas = new_c - c
+            moved_sq = (deltas * deltas).sum(axis=1).max()
+            changed = float(moved_sq) > self.__accuracy_sq
+
+            # Set the recently recalculated centroids (the kernel buffers
+            # are just swapped and fully rewritten next iteration)
+            c, new_c = new_c, c
+
+        # Materialize the public Centroid objects just once, at the end;
+        # the members are gathered in a single pass over the labels
+        # instead of re-scanning them once per cluster
+        buckets = [[] for _ in range(n_clusters)]
+        for i, label in enumerate(labels.tolist()):
+            buckets[label].append(points[i])
+
+        self.__c_cache = None
+        self.__name_index = None
+        self.__centroids = [
+            Centroid(c[cluster], buckets[cluster], names[cluster])
+            for cluster in range(n_clusters)
+        ]
+
+    def _train_pointwise(self, points: tuple[Point], x: np.ndarray):
+        """Performs the training loop for the non-euclidean metrics, for
+        which the squared-distance matrix formulation does not apply.
+
+        The assignment is still batched - each iteration asks the metric
+        for the full (N, K) distance matrix instead of evaluating the
+        distances point by point, and only the bucketing of the members
+        stays at the Python level.
+        """
+        cents = self.__centroids
 
         # Indicator of centroid movement
         changed = True
@@ -117,31 +483,33 @@ class KMeans:
         # While any of the centroids have changed its coordinates,
         # repeat another iteration
         while changed:
-            changed = False
+            # Ask the metric for all the point-to-centroid distances at
+            # once and derive the assignment from the matrix
+            c_matrix = np.stack([c._arr for c in cents])
+            labels = np.argmin(self.metric.distance_matrix(x, c_matrix),
+                               axis=1)
 
-            # Flush all the assigned instances of the centroid
-            for centroid in self.centroids:
-                centroid.flush()
+            # Collect the new cluster members in a single pass
+            buckets = [[] for _ in cents]
+            for i, label in enumerate(labels.tolist()):
+                buckets[label].append(points[i])
 
-            # For every given point, assign it to the closes centroid
-            for point in points:
-                self.closest_centroid(point).add_point(point)
+            # Hand the new members over and recompute the centroids in
+            # place, remembering their previous coordinates
+            for centroid, bucket in zip(cents, buckets):
+                centroid.assign_points(bucket)
+                centroid.recompute_in_place()
 
-            # Recalculate new centroids for the recently assigned datapoints
-            recalc = [centroid.recalculate() for centroid in self.__centroids]
+            new_coords = np.stack([c._arr for c in cents])
 
             # Check if any of the centroids have moved for distance larger,
-            # than the defined accuracy level (defined in the initor).
-            # If any have changed its position for greater distance, change
-            # the flag to again (repeat the whole while loop again)
-            for i, new_center in enumerate(recalc):
-                dist = self.metric.distance(new_center, self.__centroids[i])
-                if dist > self.accuracy:
-                    changed = True
-                    break
-
-            # Set the recently recalculated centroids
-            self.__centroids = recalc
+            # than the defined accuracy level (defined in the initor);
+            # comparing squared values spares the square roots
+            deltas = new_coords - c_matrix
+            moved_sq = (deltas * deltas).sum(axis=1).max()
+            changed = float(moved_sq) > self.__accuracy_sq
+            self.__c_cache = None
+            self.__name_index = None
 
 
 class KMeansError(Exception):
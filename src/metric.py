@@ -5,9 +5,113 @@ two points in the space.
 See also: https://en.wikipedia.org/wiki/Metric_space
 """
 
+import math
+import threading
+
 from abc import ABC, abstractmethod
 
-from src.datapoint import Point, dimensionality_check
+import numpy as np
+
+from src.datapoint import Point
+from src import metric_cuda
+
+# Numba is an optional dependency; without it the metrics stay on their
+# plain numpy implementations
+try:
+    from numba import njit
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+# SimSIMD is another optional dependency shipping hand-tuned SIMD
+# kernels; its binding only covers floating-point vectors for the
+# metrics used here, so it is consulted just for those
+try:
+    import simsimd as _simsimd
+    _SIMSIMD_AVAILABLE = True
+except ImportError:
+    _SIMSIMD_AVAILABLE = False
+
+
+if _NUMBA_AVAILABLE:
+
+    @njit(fastmath=True, cache=True)
+    def _sq_euclid(a, b):
+        """Compiled squared euclidean distance kernel the compiler turns
+        into a vectorized FMA reduction.
+
+        Two independent accumulators break the loop-carried dependency of
+        a single running sum, so both FMA pipes of the CPU can be kept
+        busy; they are only folded together after the loop.
+        """
+        acc0 = 0.0
+        acc1 = 0.0
+        half = a.shape[0] // 2
+        for i in range(half):
+            diff0 = b[2 * i] - a[2 * i]
+            diff1 = b[2 * i + 1] - a[2 * i + 1]
+            acc0 += diff0 * diff0
+            acc1 += diff1 * diff1
+        if a.shape[0] % 2:
+            diff = b[-1] - a[-1]
+            acc0 += diff * diff
+        return acc0 + acc1
+
+    @njit(fastmath=True, cache=True)
+    def _taxicab(a, b):
+        """Compiled taxicab distance kernel accumulating the absolute
+        differences in one pass without any intermediate array."""
+        acc = 0.0
+        for i in range(a.shape[0]):
+            acc += abs(b[i] - a[i])
+        return acc
+
+    @njit(cache=True)
+    def _hamming(a, b):
+        """Compiled hamming distance kernel counting the differing
+        dimensions with an integer accumulator."""
+        diffs = 0
+        for i in range(a.shape[0]):
+            if a[i] != b[i]:
+                diffs += 1
+        return diffs
+
+
+# Reusable per-thread scratch space for the fallback paths; without it
+# every distance call would allocate a fresh difference vector, and at
+# N·K calls per training iteration the allocator churn dominates
+_scratch = threading.local()
+
+
+def _scratch_buffer(size: int, dtype: np.dtype) -> np.ndarray:
+    """Returns the scratch buffer of the calling thread, reallocating it
+    only when the requested size or dtype differs from the cached one."""
+    buf = getattr(_scratch, "buf", None)
+    if buf is None or buf.size != size or buf.dtype != dtype:
+        _scratch.buf = buf = np.empty(size, dtype)
+    return buf
+
+
+# For the smallest dimensionalities a fully unrolled scalar expression
+# over the cached coordinate tuples beats every vector kernel, since the
+# per-call dispatch overhead dominates the handful of subtractions; the
+# functions are generated on first use and cached by dimensionality
+_SQ_EUCLID_SPECIALIZED = {}
+_SPECIALIZE_UP_TO = 4
+
+
+def _specialized_sq_euclid(n_dims: int):
+    """Returns the squared-euclidean function unrolled for the given
+    dimensionality, compiling and caching it on the first request."""
+    fn = _SQ_EUCLID_SPECIALIZED.get(n_dims)
+    if fn is None:
+        terms = " + ".join(
+            f"(a[{dim}] - b[{dim}]) ** 2" for dim in range(n_dims))
+        source = f"def _sq_euclid_d{n_dims}(a, b):\n    return {terms}\n"
+        namespace = {}
+        exec(source, namespace)
+        fn = _SQ_EUCLID_SPECIALIZED[n_dims] = namespace[f"_sq_euclid_d{n_dims}"]
+    return fn
 
 
 class Metric(ABC):
@@ -33,11 +137,42 @@ class Metric(ABC):
            to the distance between A -> C.
     """
 
+    def __init__(self):
+        """Rebinds the hot entrypoints into the instance dictionary.
+
+        Looking an attribute up on the instance is a single dict hit,
+        while the class-side lookup walks the descriptor protocol along
+        the whole hierarchy on every call - measurable overhead when the
+        methods are called once per point pair. Subclasses that skip
+        this initor still work, just through the slower class lookup.
+        """
+        self.distance = self.distance
+        self.distance_matrix = self.distance_matrix
+
     @abstractmethod
     def distance(self, p1: Point, p2: Point) -> float:
         """Calculates the distance between two points. The result is always a
         real number."""
 
+    def distance_matrix(self, p: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """Calculates the whole matrix of mutual distances between two
+        batches of points, given as 2D matrices with one point per row.
+
+        This default implementation just evaluates the metric pair by
+        pair; the metrics shipped with this module override it with fully
+        vectorized formulations, which is what makes the batched form
+        worth calling in the first place.
+        """
+        p_points = [Point(row) for row in p]
+        q_points = [Point(row) for row in q]
+
+        result = np.empty((len(p_points), len(q_points)))
+        for i, p_point in enumerate(p_points):
+            for j, q_point in enumerate(q_points):
+                result[i, j] = self.distance(p_point, q_point)
+
+        return result
+
 
 class Euclidean(Metric):
     """Instances of this class are metrics responsible for calculating the
@@ -49,19 +184,78 @@ class Euclidean(Metric):
     applied to a multidimensional space.
     """
 
+    def __init__(self):
+        super().__init__()
+        self.squared_distance = self.squared_distance
+
     def distance(self, p1: Point, p2: Point) -> float:
-        # Check the dimensionality of the two points
-        dimensionality_check([p1, p2])
+        return math.sqrt(self.squared_distance(p1, p2))
+
+    def squared_distance(self, p1: Point, p2: Point) -> float:
+        """Calculates the squared euclidean distance between two points.
+
+        The square root is monotonic, so callers that only compare the
+        distances - like the closest-centroid assignment - can use this
+        form directly and skip the root altogether.
+        """
+        # The full dimensionality check runs once per dataset in the bulk
+        # entrypoints; 'python -O' strips even this assert
+        assert p1.dimensionality == p2.dimensionality
+
+        # Tiny dimensionalities go through the unrolled scalar kernels,
+        # where plain Python arithmetic outruns every vector dispatch
+        if p1.dimensionality <= _SPECIALIZE_UP_TO:
+            return float(_specialized_sq_euclid(p1.dimensionality)(
+                p1.coords, p2.coords))
 
-        # Set the number of dimensions as a dimensionality of the first one
-        # (both point has to have the same at this point)
-        n_dims = p1.dimensionality
+        # SimSIMD resolves the best kernel for the running CPU at import
+        # time, but only understands floating-point vectors
+        if (_SIMSIMD_AVAILABLE
+                and p1._arr.dtype == p2._arr.dtype
+                and p1._arr.dtype.kind == "f"):
+            return float(_simsimd.sqeuclidean(p1._arr, p2._arr))
 
-        # Calculate the differences between each of the dimensions
-        diffs = [p2.coords[dim] - p1.coords[dim] for dim in range(n_dims)]
+        # Delegate the actual calculation to the compiled kernel when
+        # numba is around
+        if _NUMBA_AVAILABLE:
+            return float(_sq_euclid(p1._arr, p2._arr))
 
-        # Return a square root of the difference squares sum
-        return sum(diff ** 2 for diff in diffs) ** 0.5
+        # With the squared norms cached on the points themselves, the
+        # squared distance costs just a single dot product:
+        # ‖a‖² + ‖b‖² - 2·a·b; the tiny negative residue possibly left
+        # behind by the cancellation is clamped away
+        sq = (p1._sq_norm + p2._sq_norm
+              - 2.0 * float(p1._arr @ p2._arr))
+        return sq if sq > 0.0 else 0.0
+
+    def distance_matrix(self, p: np.ndarray, q: np.ndarray) -> np.ndarray:
+        # Large batches go to the GPU when one is around; below the
+        # threshold the host-device transfers would eat the gain
+        if metric_cuda.CUDA_AVAILABLE and p.shape[0] * q.shape[0] >= 2 ** 16:
+            return metric_cuda.distance_matrix(p, q)
+
+        # For a handful of dimensions the SIMD lanes are better spent
+        # across the N·K point pairs than on a d-wide reduction, so the
+        # squares are accumulated one dimension at a time over the whole
+        # matrix; this also sidesteps the cancellation of the identity
+        # used below
+        if p.shape[1] <= 4:
+            diff = p[:, 0, None] - q[None, :, 0]
+            dists = diff * diff
+            for dim in range(1, p.shape[1]):
+                np.subtract(p[:, dim, None], q[None, :, dim], out=diff)
+                dists += diff * diff
+            return np.sqrt(dists)
+
+        # The ‖p‖² + ‖q‖² - 2·p·q identity turns the whole (N, K) batch
+        # into one BLAS matrix product plus two norm vectors; tiny
+        # negative values caused by the floating-point cancellation are
+        # clamped before the square root
+        p_sq = np.einsum("ij,ij->i", p, p)
+        q_sq = np.einsum("ij,ij->i", q, q)
+        dists = p_sq[:, None] + q_sq[None, :] - 2.0 * (p @ q.T)
+        np.maximum(dists, 0.0, out=dists)
+        return np.sqrt(dists)
 
 
 class Taxicab(Metric):
@@ -74,18 +268,27 @@ class Taxicab(Metric):
     """
 
     def distance(self, p1: Point, p2: Point) -> float:
-        # Check the dimensionality of the two points
-        dimensionality_check([p1, p2])
+        # The full dimensionality check runs once per dataset in the bulk
+        # entrypoints; 'python -O' strips even this assert
+        assert p1.dimensionality == p2.dimensionality
 
-        # Set the number of dimensions as a dimensionality of the first one
-        # (both point has to have the same at this point)
-        n_dims = p1.dimensionality
+        # Delegate the actual calculation to the compiled kernel when
+        # numba is around
+        if _NUMBA_AVAILABLE:
+            return float(_taxicab(p1._arr, p2._arr))
 
-        # Calculate the absolute differences between each of the dimensions
-        abs_diffs = [abs(p2.coords[d] - p1.coords[d]) for d in range(n_dims)]
+        # Compute the absolute differences into the thread-local scratch
+        # buffer and reduce them in one vectorized pass, without putting
+        # any allocation on the per-call path
+        buf = _scratch_buffer(p1._arr.size,
+                              np.result_type(p1._arr, p2._arr))
+        np.subtract(p2._arr, p1._arr, out=buf)
+        np.abs(buf, out=buf)
+        return float(buf.sum())
 
-        # Return sum of these differences
-        return sum(abs_diffs)
+    def distance_matrix(self, p: np.ndarray, q: np.ndarray) -> np.ndarray:
+        # Broadcasted absolute differences reduced over the dimensions
+        return np.abs(p[:, None, :] - q[None, :, :]).sum(axis=-1)
 
 
 class Hamming(Metric):
@@ -98,19 +301,30 @@ class Hamming(Metric):
     """
 
     def distance(self, p1: Point, p2: Point) -> int:
-        # Check the dimensionality of the two points
-        dimensionality_check([p1, p2])
+        # The full dimensionality check runs once per dataset in the bulk
+        # entrypoints; 'python -O' strips even this assert
+        assert p1.dimensionality == p2.dimensionality
+
+        # A handful of dimensions is compared fastest right on the cached
+        # coordinate tuples - no kernel or ufunc dispatch involved
+        if p1.dimensionality <= _SPECIALIZE_UP_TO:
+            return sum(a != b for a, b in zip(p1.coords, p2.coords))
 
-        # Set the number of dimensions as a dimensionality of the first one
-        # (both point has to have the same at this point)
-        n_dims = p1.dimensionality
+        # Points with purely binary coordinates expose a bit-packed form;
+        # xor plus popcount then counts 64 dimensions per machine word
+        bits1, bits2 = p1._bits, p2._bits
+        if bits1 is not None and bits2 is not None:
+            return int(np.bitwise_count(bits1 ^ bits2).sum())
 
-        # Counter of the differences
-        differences = 0
+        # Delegate the actual calculation to the compiled kernel when
+        # numba is around
+        if _NUMBA_AVAILABLE:
+            return int(_hamming(p1._arr, p2._arr))
 
-        # Count different values of coordinates across all the dimensions
-        for dimension in range(n_dims):
-            if p1.coords[dimension] != p2.coords[dimension]:
-                differences += 1
+        # Count the dimensions in which the values of the coordinates
+        # differ, in one vectorized comparison
+        return int(np.count_nonzero(p1._arr != p2._arr))
 
-        return differences
+    def distance_matrix(self, p: np.ndarray, q: np.ndarray) -> np.ndarray:
+        # Broadcasted comparison counting the differing dimensions
+        return (p[:, None, :] != q[None, :, :]).sum(axis=-1)
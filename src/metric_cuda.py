@@ -0,0 +1,52 @@
+"""This module contains the optional CUDA backend for the batched
+euclidean distance calculation.
+
+It is importable on any machine - when numba or a CUDA-capable device is
+missing, the `CUDA_AVAILABLE` flag just stays False and the metrics keep
+their CPU implementations.
+"""
+
+import numpy as np
+
+# Probing the device can fail in many environment-specific ways (no
+# driver, no toolkit, no card), all of which simply mean "no GPU here"
+try:
+    from numba import cuda
+    CUDA_AVAILABLE = cuda.is_available()
+except Exception:
+    CUDA_AVAILABLE = False
+
+
+if CUDA_AVAILABLE:
+
+    @cuda.jit
+    def _euclid_nk(p, q, out):
+        """Pairwise euclidean kernel; every thread computes one entry of
+        the (N, K) distance matrix with its own reduction over the
+        dimensions."""
+        i, k = cuda.grid(2)
+        if i < p.shape[0] and k < q.shape[0]:
+            acc = 0.0
+            for j in range(p.shape[1]):
+                diff = p[i, j] - q[k, j]
+                acc += diff * diff
+            out[i, k] = acc ** 0.5
+
+
+def distance_matrix(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Computes the full euclidean distance matrix on the GPU and copies
+    it back to the host.
+
+    Callers are expected to consult `CUDA_AVAILABLE` first; the kernel
+    only exists when the probe above succeeded.
+    """
+    p_dev = cuda.to_device(np.ascontiguousarray(p))
+    q_dev = cuda.to_device(np.ascontiguousarray(q))
+    out_dev = cuda.device_array((p.shape[0], q.shape[0]))
+
+    threads = (16, 16)
+    blocks = ((p.shape[0] + threads[0] - 1) // threads[0],
+              (q.shape[0] + threads[1] - 1) // threads[1])
+    _euclid_nk[blocks, threads](p_dev, q_dev, out_dev)
+
+    return out_dev.copy_to_host()
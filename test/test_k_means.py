@@ -0,0 +1,30 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.datapoint import Centroid, Point, InconsistentDimensionalityError
+from src.k_means import KMeans
+
+
+def test_half_precision_kmeanspp_training():
+    # Regression test: the k-means++ probability vector used to inherit
+    # the float16 training dtype, overflow while summing and get refused
+    # by the random generator
+    random.seed(42)
+    points = [Point([random.random() * 100 for _ in range(3)])
+              for _ in range(2000)]
+
+    model = KMeans(5, init_method="k-means++", dtype=np.float16)
+    model.train(points)
+
+    assert sum(c.number_of_points for c in model.centroids) == len(points)
+
+
+def test_raises_on_mismatched_default_centroids():
+    points = [Point([1, 2, 3]), Point([4, 5, 6]), Point([7, 8, 9])]
+    defaults = [Centroid(coords=[0, 0], points=[]),
+                Centroid(coords=[5, 5], points=[])]
+
+    with pytest.raises(InconsistentDimensionalityError):
+        KMeans(2).train(points, defaults)